@@ -15,9 +15,11 @@ class CropRecommendation {
   });
 
   factory CropRecommendation.fromJson(Map<String, dynamic> json) {
+    // The API sends an integer percentage (e.g. 95); older builds sent "95%".
+    final raw = json['confidence'];
     return CropRecommendation(
       crop: json['crop'] as String? ?? 'Unknown',
-      confidence: json['confidence'] as String? ?? '0%',
+      confidence: raw is num ? '${raw.round()}%' : raw as String? ?? '0%',
     );
   }
 }
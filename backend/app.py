@@ -19,19 +19,27 @@ Endpoints:
 
 Startup:
     All trained models (rf_model.pkl, svm_model.pkl, mlp_model.pkl) and
-    the shared scaler (scaler.pkl) are loaded once at module level.
+    the SVM / MLP scaler (scaler.pkl) are loaded once at module level.
+    The RandomForests are trained on unscaled features and skip the scaler.
+    The legacy forest is served from a compiled predictor (ONNX Runtime or
+    Treelite) when available (see utils/compiled_model.py).
 
 Usage:
-    python app.py          # Development server on port 5000
-    gunicorn app:app       # Production (Linux / Docker)
+    python app.py                            # Development server on port 5000
+    gunicorn -c gunicorn.conf.py app:app     # Production (Linux / Docker)
 """
 
 import os
+import queue
+import threading
 import traceback
+from functools import lru_cache
+from operator import itemgetter
 
 import numpy as np
 import joblib
-from flask import Flask, request, jsonify
+import orjson
+from flask import Flask, request
 from flask_cors import CORS
 
 from utils.validators import validate_input, check_realistic_ranges
@@ -40,6 +48,8 @@ from utils.ensemble import ensemble_predict
 from utils.et0 import build_irrigation_schedule
 from utils.rotation import get_rotation_plan
 from utils.anomaly import detect_anomalies
+from utils.compiled_model import load_compiled_model
+from utils.batching import MicroBatcher
 from utils.external_apis import (
     fetch_openmeteo_forecast,
     fetch_soilgrids_profile,
@@ -54,17 +64,26 @@ app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes (allows any frontend origin)
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Load ML artifacts at startup — one-time load for fast per-request inference
+# Load ML artifacts at startup — one-time load (pre-fork under Gunicorn preload_app)
 # ──────────────────────────────────────────────────────────────────────────────
 MODEL_DIR    = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model")
 FEATURE_ORDER = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
 
+# Fetches all model features from the request dict in FEATURE_ORDER in one call
+_FEATURE_GETTER = itemgetter(*FEATURE_ORDER)
 
-def _load_artifact(filename: str):
-    """Load a joblib artifact from MODEL_DIR; return None on failure."""
+
+def _load_artifact(filename: str, mmap: bool = False):
+    """
+    Load a joblib artifact from MODEL_DIR; return None on failure.
+
+    With mmap=True the artifact's NumPy arrays are memory-mapped read-only
+    (mmap_mode="r") instead of read into private memory, so they are paged in
+    lazily and shared between Gunicorn workers through the page cache.
+    """
     path = os.path.join(MODEL_DIR, filename)
     try:
-        obj = joblib.load(path)
+        obj = joblib.load(path, mmap_mode="r" if mmap else None)
         print(f"[OK] Loaded {filename}")
         return obj
     except FileNotFoundError:
@@ -74,14 +93,30 @@ def _load_artifact(filename: str):
 
 print("\n[*] AgriSense AI - Loading ML artifacts...")
 
-# Legacy RandomForest (for /api/recommend backward compat)
-crop_model     = _load_artifact("crop_model.pkl")
-feature_scaler = _load_artifact("scaler.pkl")
+# Legacy RandomForest (for /api/recommend backward compat) — unscaled inputs
+crop_model = _load_artifact("crop_model.pkl")
+
+# Compiled view of the legacy forest (ONNX / Treelite) — falls back to crop_model
+crop_predictor = load_compiled_model(crop_model, os.path.join(MODEL_DIR, "crop_model.pkl"))
 
-# Ensemble models
+# Coalesces concurrent /api/recommend rows into one predict_proba call
+crop_batcher = MicroBatcher(crop_predictor.predict_proba) if crop_predictor is not None else None
+
+# Ensemble models — the scaler is only applied to SVM / MLP inputs.
+# Only the MLP is memory-mapped: sklearn's Tree copies its node arrays on
+# unpickle anyway, and libsvm's predict_proba rejects read-only buffers.
+feature_scaler = _load_artifact("scaler.pkl")
 rf_model  = _load_artifact("rf_model.pkl")
 svm_model = _load_artifact("svm_model.pkl")
-mlp_model = _load_artifact("mlp_model.pkl")
+mlp_model = _load_artifact("mlp_model.pkl", mmap=True)
+
+# Inline scaler parameters — avoids StandardScaler.transform dispatch/allocation
+if feature_scaler is not None:
+    SCALER_MEAN      = feature_scaler.mean_.astype(np.float64)
+    SCALER_SCALE_INV = (1.0 / feature_scaler.scale_).astype(np.float64)
+
+# Per-thread (1, 7) scratch buffer for the scaled SVM / MLP input
+_scale_scratch = threading.local()
 
 # Assemble the ensemble dict — only include models that loaded successfully
 ensemble_models = {}
@@ -91,55 +126,154 @@ if mlp_model is not None: ensemble_models["mlp"] = mlp_model
 
 # Use any available model to get the class labels (all share the same label set)
 _label_source = rf_model or svm_model or mlp_model or crop_model
-CLASS_LABELS  = _label_source.classes_ if _label_source is not None else []
+CLASS_LABELS  = tuple(_label_source.classes_.tolist()) if _label_source is not None else ()
+
+# Legacy forest labels, resolved once (classes_ is immutable after load)
+LEGACY_CLASS_LABELS = tuple(crop_model.classes_.tolist()) if crop_model is not None else ()
 
 print(f"[OK] Ensemble ready: {list(ensemble_models.keys())} | Classes: {len(CLASS_LABELS)}\n")
 
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Shared input parsing helper
+# Shared input parsing helpers
 # ──────────────────────────────────────────────────────────────────────────────
 
+def ojson(obj, status: int = 200):
+    """
+    Serialise obj with orjson and wrap it in a JSON Response.
+
+    Drop-in replacement for ``jsonify(obj), status`` — orjson is several
+    times faster than the stdlib encoder and serialises NumPy scalars/arrays
+    directly.
+    """
+    return app.response_class(
+        orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype="application/json",
+    )
+
+
+def _load_json_body():
+    """
+    Parse the raw request body with orjson; return None if empty or invalid.
+
+    Bypasses Flask's content-type sniffing and stdlib JSON decoder.
+    cache=False stops Werkzeug from keeping a second copy of the body on
+    the request object.
+    """
+    try:
+        return orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return None
+
+
 def _parse_and_validate_sensor_input():
     """
     Parse the JSON body, validate required fields, apply rainfall fallback,
     run range checks, and return a tuple:
       (data, feature_vector_2d, warnings, confidence_penalty, error_response)
 
-    If validation fails, error_response is a tuple (json_body, status_code)
+    If validation fails, error_response is a ready-made JSON error Response
     and all other return values are None.
     """
-    data = request.get_json(silent=True)
+    data = _load_json_body()  # None is reported by validate_input
 
     errors = validate_input(data)
     if errors:
         return None, None, None, None, (
-            jsonify({"status": "error",
-                     "message": "Input validation failed.",
-                     "errors": errors}), 400
+            ojson({"status": "error",
+                   "message": "Input validation failed.",
+                   "errors": errors}, 400)
         )
 
     rainfall_source = "sensor"
     if data.get("rainfall") is None:
         data["rainfall"] = get_default_rainfall()
         rainfall_source = "estimated (fallback)"
+    data["rainfall"] = float(data["rainfall"])  # Reused as-is in the response
 
     warnings, confidence_penalty = check_realistic_ranges(data)
 
-    feature_vector = np.array([[
-        float(data["N"]),
-        float(data["P"]),
-        float(data["K"]),
-        float(data["temperature"]),
-        float(data["humidity"]),
-        float(data["ph"]),
-        float(data["rainfall"]),
-    ]])
+    # float32: tree backends compare in float32 — no downcast copy later
+    feature_vector = np.fromiter(
+        map(float, _FEATURE_GETTER(data)), dtype=np.float32, count=len(FEATURE_ORDER),
+    ).reshape(1, len(FEATURE_ORDER))
 
     data["_rainfall_source"] = rainfall_source
     return data, feature_vector, warnings, confidence_penalty, None
 
 
+def _report_exception(exc: Exception) -> None:
+    """Full traceback in debug mode; a one-line summary in production."""
+    if app.debug:
+        traceback.print_exc()
+    else:
+        print(f"[!] {request.method} {request.path} failed: {exc!r}")
+
+
+def _scale_features(feature_vector: np.ndarray) -> np.ndarray:
+    """
+    Standardise a (1, 7) feature vector into this thread's scratch buffer.
+
+    Equivalent to feature_scaler.transform() but reuses one preallocated
+    array per thread.  The result is only valid until the next call on the
+    same thread.
+    """
+    buf = getattr(_scale_scratch, "buf", None)
+    if buf is None:
+        buf = _scale_scratch.buf = np.empty((1, len(FEATURE_ORDER)))
+    np.subtract(feature_vector, SCALER_MEAN, out=buf)
+    np.multiply(buf, SCALER_SCALE_INV, out=buf)
+    return buf
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Legacy prediction cache
+# ESP32 readings drift slowly, so a small set of (quantised) inputs dominates
+# traffic.  The cache stores only the raw top-3 — the confidence penalty from
+# range warnings is applied afterwards so it never leaks between requests.
+# ──────────────────────────────────────────────────────────────────────────────
+PREDICTION_CACHE_SIZE = 4096
+CACHE_LOG_EVERY       = 200    # Print the hit ratio every N lookups
+PREDICT_TIMEOUT       = 5.0    # Seconds to wait for a batched prediction
+
+# Decimal places kept per feature, in FEATURE_ORDER
+_QUANTIZE_DIGITS = (1, 1, 1, 1, 1, 2, 0)
+
+
+def _quantize_features(feature_vector: np.ndarray) -> tuple:
+    """Round a (1, 7) feature vector into a hashable cache key."""
+    return tuple(
+        round(value, digits)
+        for value, digits in zip(feature_vector[0].tolist(), _QUANTIZE_DIGITS)
+    )
+
+
+@lru_cache(maxsize=PREDICTION_CACHE_SIZE)
+def _rank_crops(key: tuple):
+    """
+    Return (top3_indices, top3_probabilities) for a quantised feature key.
+
+    The model scores the quantised values themselves so a cached entry never
+    depends on which request happened to populate it.
+    """
+    probabilities = crop_batcher.submit(np.array([key], dtype=np.float32),
+                                        timeout=PREDICT_TIMEOUT)
+    # O(K) partial selection of the 3 largest, then order just those 3
+    top_unsorted  = np.argpartition(probabilities, -3)[-3:]
+    top_indices   = top_unsorted[np.argsort(probabilities[top_unsorted])[::-1]]
+    return tuple(top_indices.tolist()), tuple(probabilities[top_indices].tolist())
+
+
+def _log_cache_stats() -> None:
+    """Periodically print the prediction cache hit ratio."""
+    info = _rank_crops.cache_info()
+    lookups = info.hits + info.misses
+    if lookups and lookups % CACHE_LOG_EVERY == 0:
+        print(f"[i] Prediction cache: {info.hits / lookups:.1%} hit ratio "
+              f"over {lookups} lookups ({info.currsize}/{info.maxsize} entries)")
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # Routes
 # ══════════════════════════════════════════════════════════════════════════════
@@ -150,7 +284,7 @@ def _parse_and_validate_sensor_input():
 @app.route("/", methods=["GET"])
 def health_check():
     """Simple health-check endpoint for monitoring / load-balancers."""
-    return jsonify({
+    return ojson({
         "status":       "ok",
         "service":      "AgriSense AI — Crop Recommendation API v2",
         "model_status": {
@@ -177,7 +311,7 @@ def health_check():
 @app.route("/api/recommend", methods=["POST"])
 def recommend_crop():
     """
-    Predict the top-3 suitable crops (legacy endpoint — original response shape).
+    Predict the top-3 suitable crops (legacy endpoint).
 
     Expected JSON body:
     {
@@ -186,47 +320,60 @@ def recommend_crop():
         "temperature": float, "humidity": float,
         "rainfall": float  (OPTIONAL)
     }
+
+    Returns:
+    {
+        "status": "success",
+        "recommendations": [ { "crop": "Rice", "confidence": 95 }, ... ],
+        "warnings": [...] or null,
+        "metadata": { "rainfall_source", "rainfall_value_used" }
+    }
+    "confidence" is an integer percentage (0–100).
     """
     try:
-        if crop_model is None or feature_scaler is None:
-            return jsonify({
+        if crop_model is None:
+            return ojson({
                 "status":  "error",
                 "message": "ML model not loaded. Run 'python model/train_model.py'.",
-            }), 503
+            }, 503)
 
         data, feature_vector, warnings, confidence_penalty, err = _parse_and_validate_sensor_input()
         if err:
             return err
 
-        scaled = feature_scaler.transform(feature_vector)
-        probabilities = crop_model.predict_proba(scaled)[0]
-        class_labels  = crop_model.classes_
-        top_indices   = np.argsort(probabilities)[::-1][:3]
+        try:
+            top_indices, top_probabilities = _rank_crops(_quantize_features(feature_vector))
+        except (queue.Full, TimeoutError):
+            return ojson({
+                "status":  "error",
+                "message": "Server busy. Please retry shortly.",
+            }, 503)
+        _log_cache_stats()
 
         recommendations = []
-        for idx in top_indices:
-            adjusted = max(probabilities[idx] - confidence_penalty, 0.01)
+        for idx, probability in zip(top_indices, top_probabilities):
+            adjusted = max(probability - confidence_penalty, 0.01)
             recommendations.append({
-                "crop":       class_labels[idx],
-                "confidence": f"{adjusted * 100:.0f}%",
+                "crop":       LEGACY_CLASS_LABELS[idx],
+                "confidence": int(round(adjusted * 100)),
             })
 
-        return jsonify({
+        return ojson({
             "status":          "success",
             "recommendations": recommendations,
             "warnings":        warnings if warnings else None,
             "metadata": {
                 "rainfall_source":     data["_rainfall_source"],
-                "rainfall_value_used": float(data["rainfall"]),
+                "rainfall_value_used": data["rainfall"],
             },
-        }), 200
+        }, 200)
 
     except Exception as exc:
-        traceback.print_exc()
-        return jsonify({
+        _report_exception(exc)
+        return ojson({
             "status":  "error",
             "message": f"Unexpected error: {str(exc)}",
-        }), 500
+        }, 500)
 
 
 # ── Ensemble prediction endpoint ──────────────────────────────────────────────
@@ -255,26 +402,27 @@ def predict_ensemble():
     }
     """
     try:
-        if not ensemble_models:
-            return jsonify({
+        if not ensemble_models or feature_scaler is None:
+            return ojson({
                 "status":  "error",
                 "message": "No ensemble models loaded. Run 'python model/train_model.py'.",
-            }), 503
+            }, 503)
 
         data, feature_vector, warnings, confidence_penalty, err = _parse_and_validate_sensor_input()
         if err:
             return err
 
-        scaled = feature_scaler.transform(feature_vector)
+        scaled = _scale_features(feature_vector)
 
         result = ensemble_predict(
             models=ensemble_models,
             scaled_features=scaled,
             class_labels=CLASS_LABELS,
             confidence_penalty=confidence_penalty,
+            raw_features=feature_vector,
         )
 
-        return jsonify({
+        return ojson({
             "status":          "success",
             "top_crop":        result["top_crop"],
             "top_confidence":  result["top_confidence"],
@@ -284,17 +432,17 @@ def predict_ensemble():
             "warnings":        warnings if warnings else None,
             "metadata": {
                 "rainfall_source":     data["_rainfall_source"],
-                "rainfall_value_used": float(data["rainfall"]),
+                "rainfall_value_used": data["rainfall"],
                 "models_available":    list(ensemble_models.keys()),
             },
-        }), 200
+        }, 200)
 
     except Exception as exc:
-        traceback.print_exc()
-        return jsonify({
+        _report_exception(exc)
+        return ojson({
             "status":  "error",
             "message": f"Unexpected error: {str(exc)}",
-        }), 500
+        }, 500)
 
 
 # ── Weather forecast proxy ────────────────────────────────────────────────────
@@ -315,26 +463,26 @@ def weather_forecast():
         lon = request.args.get("lon", type=float)
 
         if lat is None or lon is None:
-            return jsonify({
+            return ojson({
                 "status":  "error",
                 "message": "Query parameters 'lat' and 'lon' are required.",
-            }), 400
+            }, 400)
 
         if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
-            return jsonify({
+            return ojson({
                 "status":  "error",
                 "message": "Invalid coordinates. lat ∈ [-90, 90], lon ∈ [-180, 180].",
-            }), 400
+            }, 400)
 
         result = fetch_openmeteo_forecast(lat, lon)
         if result.get("error"):
-            return jsonify({"status": "error", "message": result["message"]}), 502
+            return ojson({"status": "error", "message": result["message"]}, 502)
 
-        return jsonify({"status": "success", **result}), 200
+        return ojson({"status": "success", **result}, 200)
 
     except Exception as exc:
-        traceback.print_exc()
-        return jsonify({"status": "error", "message": str(exc)}), 500
+        _report_exception(exc)
+        return ojson({"status": "error", "message": str(exc)}, 500)
 
 
 # ── SoilGrids soil profile proxy ──────────────────────────────────────────────
@@ -355,20 +503,20 @@ def soil_profile():
         lon = request.args.get("lon", type=float)
 
         if lat is None or lon is None:
-            return jsonify({
+            return ojson({
                 "status":  "error",
                 "message": "Query parameters 'lat' and 'lon' are required.",
-            }), 400
+            }, 400)
 
         result = fetch_soilgrids_profile(lat, lon)
         if result.get("error"):
-            return jsonify({"status": "error", "message": result["message"]}), 502
+            return ojson({"status": "error", "message": result["message"]}, 502)
 
-        return jsonify({"status": "success", **result}), 200
+        return ojson({"status": "success", **result}, 200)
 
     except Exception as exc:
-        traceback.print_exc()
-        return jsonify({"status": "error", "message": str(exc)}), 500
+        _report_exception(exc)
+        return ojson({"status": "error", "message": str(exc)}, 500)
 
 
 # ── NASA POWER solar radiation proxy ─────────────────────────────────────────
@@ -390,20 +538,20 @@ def nasa_solar():
         lon = request.args.get("lon", type=float)
 
         if lat is None or lon is None:
-            return jsonify({
+            return ojson({
                 "status":  "error",
                 "message": "Query parameters 'lat' and 'lon' are required.",
-            }), 400
+            }, 400)
 
         result = fetch_nasa_solar(lat, lon)
         if result.get("error"):
-            return jsonify({"status": "error", "message": result["message"]}), 502
+            return ojson({"status": "error", "message": result["message"]}, 502)
 
-        return jsonify({"status": "success", **result}), 200
+        return ojson({"status": "success", **result}, 200)
 
     except Exception as exc:
-        traceback.print_exc()
-        return jsonify({"status": "error", "message": str(exc)}), 500
+        _report_exception(exc)
+        return ojson({"status": "error", "message": str(exc)}, 500)
 
 
 # ── Irrigation scheduler ──────────────────────────────────────────────────────
@@ -454,11 +602,11 @@ def irrigation_today():
             forecast_days=today_days if today_days else None,
         )
 
-        return jsonify({"status": "success", **schedule}), 200
+        return ojson({"status": "success", **schedule}, 200)
 
     except Exception as exc:
-        traceback.print_exc()
-        return jsonify({"status": "error", "message": str(exc)}), 500
+        _report_exception(exc)
+        return ojson({"status": "error", "message": str(exc)}, 500)
 
 
 # ── Crop rotation planner ─────────────────────────────────────────────────────
@@ -488,10 +636,10 @@ def rotation_plan():
     try:
         crop = request.args.get("crop", "").strip()
         if not crop:
-            return jsonify({
+            return ojson({
                 "status":  "error",
                 "message": "Query parameter 'crop' is required.",
-            }), 400
+            }, 400)
 
         n_val = request.args.get("n", type=float)
         p_val = request.args.get("p", type=float)
@@ -499,11 +647,11 @@ def rotation_plan():
 
         plan = get_rotation_plan(crop, n_value=n_val, p_value=p_val, k_value=k_val)
 
-        return jsonify({"status": "success", **plan}), 200
+        return ojson({"status": "success", **plan}, 200)
 
     except Exception as exc:
-        traceback.print_exc()
-        return jsonify({"status": "error", "message": str(exc)}), 500
+        _report_exception(exc)
+        return ojson({"status": "error", "message": str(exc)}, 500)
 
 
 # ── Anomaly detection ─────────────────────────────────────────────────────────
@@ -535,32 +683,32 @@ def anomaly_check():
     }
     """
     try:
-        body = request.get_json(silent=True)
+        body = _load_json_body()
         if not body or "readings" not in body:
-            return jsonify({
+            return ojson({
                 "status":  "error",
                 "message": "Request body must include a 'readings' list.",
-            }), 400
+            }, 400)
 
         readings = body["readings"]
         if not isinstance(readings, list):
-            return jsonify({
+            return ojson({
                 "status":  "error",
                 "message": "'readings' must be a JSON array.",
-            }), 400
+            }, 400)
 
         anomalies = detect_anomalies(readings)
 
-        return jsonify({
+        return ojson({
             "status":        "success",
             "total_checked": len(readings),
             "anomaly_count": len(anomalies),
             "anomalies":     anomalies,
-        }), 200
+        }, 200)
 
     except Exception as exc:
-        traceback.print_exc()
-        return jsonify({"status": "error", "message": str(exc)}), 500
+        _report_exception(exc)
+        return ojson({"status": "error", "message": str(exc)}, 500)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -571,20 +719,20 @@ def anomaly_check():
 @app.errorhandler(404)
 def not_found(error):
     """Return JSON instead of the default HTML 404 page."""
-    return jsonify({
+    return ojson({
         "status":  "error",
         "message": "Endpoint not found.",
         "hint":    "GET / for available endpoints.",
-    }), 404
+    }, 404)
 
 
 @app.errorhandler(405)
 def method_not_allowed(error):
     """Return JSON for wrong HTTP method."""
-    return jsonify({
+    return ojson({
         "status":  "error",
         "message": "HTTP method not allowed for this endpoint.",
-    }), 405
+    }, 405)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -592,6 +740,7 @@ def method_not_allowed(error):
 # ══════════════════════════════════════════════════════════════════════════════
 
 if __name__ == "__main__":
+    # Local development only — production runs under Gunicorn (gunicorn.conf.py)
     print("[*] Starting AgriSense AI - Crop Recommendation API v2")
     print("   Docs: GET / for full endpoint list\n")
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,43 @@
+"""
+gunicorn.conf.py — Production Gunicorn settings for the AgriSense AI API.
+
+The ML artifacts are loaded at import time of app.py, so with preload_app the
+master process loads them once and every forked worker shares the same pages
+copy-on-write instead of holding its own copy of the forest.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+# ── Binding ───────────────────────────────────────────────────────────────────
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# ── Workers ───────────────────────────────────────────────────────────────────
+# CPUs this process may actually run on — os.cpu_count() reports the whole
+# host and ignores container CPU sets / taskset affinity.
+if hasattr(os, "sched_getaffinity"):
+    _cpus = len(os.sched_getaffinity(0))
+else:
+    _cpus = os.cpu_count() or 1
+
+# Classic 2 × cores + 1 sizing, overridable with WEB_CONCURRENCY; threaded
+# workers overlap the external API proxies (Open-Meteo, SoilGrids, NASA POWER)
+# with model inference, and let concurrent /api/recommend calls share one
+# micro-batch (utils/batching.py).
+workers      = int(os.environ.get("WEB_CONCURRENCY", 2 * _cpus + 1))
+worker_class = "gthread"
+threads      = 8
+
+# Load app.py (and therefore all .pkl models) in the master before forking
+preload_app = True
+
+# ── Timeouts / recycling ──────────────────────────────────────────────────────
+timeout = 60
+
+# Recycle workers periodically to bound memory growth; jitter avoids all
+# workers restarting at the same moment.  Kept high because a recycled worker
+# starts with an empty prediction cache (app.py PREDICTION_CACHE_SIZE).
+max_requests        = 10000
+max_requests_jitter = 1000
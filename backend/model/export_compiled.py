@@ -0,0 +1,98 @@
+"""
+export_compiled.py — Export the committed crop_model.pkl to a compiled backend.
+
+train_model.py only produces crop_model.onnx as a side effect of a full
+retrain, so a service built from the committed pickles would never use it.
+This script converts the EXISTING crop_model.pkl without retraining and is
+run by the backend Dockerfile at image build time.
+
+Requires the optional packages in requirements-accel.txt (skl2onnx,
+onnxruntime).  app.py falls back to scikit-learn inference whenever the
+compiled artifact is missing or older than the pickle.
+
+The Treelite / TL2cgen native library (crop_model.so) is DEV-ONLY: it needs
+treelite, tl2cgen and gcc, none of which ship in requirements or the image.
+Build it locally with --treelite when benchmarking.
+
+Usage:
+    python model/export_compiled.py              # crop_model.onnx
+    python model/export_compiled.py --treelite   # + crop_model.so (dev-only)
+"""
+
+import os
+import sys
+
+import joblib
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def export_onnx_forest(model, onnx_path: str) -> bool:
+    """
+    Export the RandomForest to ONNX for onnxruntime inference.
+
+    zipmap is disabled so the session returns a dense (n, n_classes)
+    probability tensor in model.classes_ order.  Optional — skipped when
+    skl2onnx is unavailable.  Returns True if the file was written.
+    """
+    try:
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+    except ImportError:
+        print(f"      [i] skl2onnx not installed - skipping {os.path.basename(onnx_path)}")
+        return False
+
+    try:
+        onx = convert_sklearn(
+            model,
+            initial_types=[("X", FloatTensorType([None, model.n_features_in_]))],
+            options={id(model): {"zipmap": False}},
+        )
+    except Exception as exc:
+        print(f"      [!] Could not export {os.path.basename(onnx_path)}: {exc}")
+        return False
+
+    with open(onnx_path, "wb") as fh:
+        fh.write(onx.SerializeToString())
+    print(f"      [OK] {os.path.basename(onnx_path)}")
+    return True
+
+
+def export_treelite_forest(model, lib_path: str) -> bool:
+    """
+    Compile the RandomForest into a native shared library via Treelite/TL2cgen.
+
+    Thresholds are quantised to integer bin indices so each node comparison is
+    a single integer compare.  DEV-ONLY: treelite / tl2cgen and a C compiler
+    are not in any requirements file or in the Docker image, so this is
+    skipped there.  Returns True if the library was written.
+    """
+    try:
+        import treelite
+        import tl2cgen
+    except ImportError:
+        print(f"      [i] treelite/tl2cgen not installed - skipping {os.path.basename(lib_path)}")
+        return False
+
+    try:
+        tl_model = treelite.sklearn.import_model(model)
+        tl2cgen.export_lib(tl_model, toolchain="gcc", libpath=lib_path,
+                           params={"parallel_comp": 4, "quantize": 1})
+    except Exception as exc:
+        print(f"      [!] Could not compile {os.path.basename(lib_path)}: {exc}")
+        return False
+    print(f"      [OK] {os.path.basename(lib_path)} (classes: {len(model.classes_)})")
+    return True
+
+
+def main() -> int:
+    model_path = os.path.join(MODEL_DIR, "crop_model.pkl")
+    model = joblib.load(model_path)
+    ok = export_onnx_forest(model, os.path.join(MODEL_DIR, "crop_model.onnx"))
+    if "--treelite" in sys.argv[1:]:
+        ok = export_treelite_forest(model, os.path.join(MODEL_DIR, "crop_model.so")) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
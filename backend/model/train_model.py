@@ -6,10 +6,20 @@ Trains THREE models from the same synthetic agricultural dataset:
   2. SVC (RBF, probability)  → svm_model.pkl  (high precision on boundary cases)
   3. MLPClassifier           → mlp_model.pkl  (neural network — pattern recognition)
 
-All three models + the shared StandardScaler are saved side-by-side in model/.
+All three models + the StandardScaler are saved side-by-side in model/.
 The legacy crop_model.pkl (RandomForest) is also re-saved so the original
 /api/recommend endpoint continues to work without any changes.
 
+If skl2onnx / treelite + tl2cgen are installed, the legacy forest is also
+exported to ONNX (crop_model.onnx) and compiled to a native predictor with
+quantised thresholds (crop_model.so, dev-only); see export_compiled.py.
+app.py prefers these over scikit-learn inference when present.
+
+The RandomForest is trained on the RAW (unscaled) features: its splits are
+axis-aligned threshold comparisons, so scaling is redundant and skipping it
+removes a transform from the inference hot path.  The scaler is only used by
+the SVM and MLP.
+
 Features used for prediction:
     N, P, K, temperature, humidity, ph, rainfall
 
@@ -28,6 +38,13 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
 import joblib
 
+try:
+    # python -m model.train_model (from backend/)
+    from model.export_compiled import export_onnx_forest, export_treelite_forest
+except ImportError:
+    # python model/train_model.py — model/ itself is on sys.path
+    from export_compiled import export_onnx_forest, export_treelite_forest
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Realistic feature ranges for each crop (N, P, K, Temp, Humidity, pH, Rainfall)
@@ -61,6 +78,16 @@ CROP_PROFILES = {
 FEATURE_COLUMNS = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
 SAMPLES_PER_CROP = 120  # Synthetic samples per crop class
 
+# CROP_PROFILES flattened to arrays for vectorised sampling:
+#   CROP_NAMES[i]        → crop label of row i
+#   CROP_BOUNDS[i, j, :] → (low, high) of FEATURE_COLUMNS[j] for crop i
+_PROFILE_KEYS = ["N", "P", "K", "temp", "humidity", "ph", "rainfall"]
+CROP_NAMES  = list(CROP_PROFILES)
+CROP_BOUNDS = np.array(
+    [[profile[key] for key in _PROFILE_KEYS] for profile in CROP_PROFILES.values()],
+    dtype=np.float32,
+)  # shape (n_crops, n_features, 2)
+
 
 def generate_synthetic_data() -> pd.DataFrame:
     """
@@ -68,28 +95,21 @@ def generate_synthetic_data() -> pd.DataFrame:
 
     Each crop gets SAMPLES_PER_CROP rows sampled uniformly within its defined
     feature ranges, with small Gaussian noise added for a more realistic spread.
+    All samples are drawn in a single vectorised NumPy call.
     """
-    records = []
-    for crop_name, ranges in CROP_PROFILES.items():
-        for _ in range(SAMPLES_PER_CROP):
-            row = {
-                "N":           np.random.uniform(*ranges["N"]),
-                "P":           np.random.uniform(*ranges["P"]),
-                "K":           np.random.uniform(*ranges["K"]),
-                "temperature": np.random.uniform(*ranges["temp"]),
-                "humidity":    np.random.uniform(*ranges["humidity"]),
-                "ph":          np.random.uniform(*ranges["ph"]),
-                "rainfall":    np.random.uniform(*ranges["rainfall"]),
-                "label":       crop_name,
-            }
-            records.append(row)
-
-    df = pd.DataFrame(records)
+    lows, highs = CROP_BOUNDS[..., 0], CROP_BOUNDS[..., 1]
+
+    n_crops, n_features = lows.shape
+    samples = np.random.uniform(
+        lows[:, None, :], highs[:, None, :],
+        size=(n_crops, SAMPLES_PER_CROP, n_features),
+    ).reshape(n_crops * SAMPLES_PER_CROP, n_features)
 
     # Add small Gaussian noise to numeric columns for natural variance
-    for col in FEATURE_COLUMNS:
-        noise = np.random.normal(0, 0.5, size=len(df))
-        df[col] = df[col] + noise
+    samples += np.random.normal(0, 0.5, size=samples.shape)
+
+    df = pd.DataFrame(samples, columns=FEATURE_COLUMNS)
+    df["label"] = np.repeat(CROP_NAMES, SAMPLES_PER_CROP)
 
     # Clamp pH and humidity to physically valid ranges after noise
     df["ph"]       = df["ph"].clip(0, 14)
@@ -105,13 +125,31 @@ def _print_accuracy(name: str, model, X_test_scaled, y_test) -> None:
     print(f"\n  [{name}] Test accuracy: {acc:.2%}")
 
 
+def _dump_atomic(obj, path: str) -> None:
+    """
+    joblib.dump to a temp file in the same directory, then os.replace() it.
+
+    app.py memory-maps some pickles (mmap_mode="r"); truncating a mapped file
+    in place would SIGBUS a running API process.  Replacing the directory
+    entry leaves the old inode intact for anyone still mapping it.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        # Uncompressed so app.py can memory-map the arrays
+        joblib.dump(obj, tmp_path, compress=0, protocol=5)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 def train_and_save_models() -> None:
     """
     Full ensemble training pipeline:
       1. Generate synthetic dataset
       2. Train/test split
-      3. Fit StandardScaler on training data
-      4. Train RF, SVM, MLP models
+      3. Fit StandardScaler on training data (SVM / MLP only)
+      4. Train RF (unscaled), SVM, MLP models
       5. Evaluate all three
       6. Save all artifacts to model/
     """
@@ -140,7 +178,7 @@ def train_and_save_models() -> None:
     # --------------------------------------------------------------------------
     # Step 3: Fit scaler
     # --------------------------------------------------------------------------
-    print("\n[3/5] Fitting StandardScaler...")
+    print("\n[3/5] Fitting StandardScaler (SVM / MLP)...")
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled  = scaler.transform(X_test)
@@ -150,11 +188,16 @@ def train_and_save_models() -> None:
     # --------------------------------------------------------------------------
     print("\n[4/5] Training ensemble models...")
 
-    print("      -> RandomForestClassifier (n_estimators=100)...")
-    rf_model = RandomForestClassifier(n_estimators=100, max_depth=15,
+    print("      -> RandomForestClassifier (n_estimators=80, max_depth=12)...")
+    # Shallower than the previous 100-tree depth-15 forest (~1/3 fewer nodes)
+    # while matching its mean accuracy over seeded synthetic draws; depth 10 /
+    # min_samples_leaf=2 was ~0.26 pp worse.
+    rf_model = RandomForestClassifier(n_estimators=80, max_depth=12,
                                       random_state=42, n_jobs=-1)
-    rf_model.fit(X_train_scaled, y_train)
-    _print_accuracy("Random Forest", rf_model, X_test_scaled, y_test)
+    rf_model.fit(X_train, y_train)  # Scale-invariant — no scaler needed
+    # Parallel fit only: a thread pool per single-row predict costs more than it saves
+    rf_model.n_jobs = 1
+    _print_accuracy("Random Forest", rf_model, X_test, y_test)
 
     print("\n      -> SVC (kernel=rbf, probability=True)...")
     svm_model = SVC(kernel="rbf", probability=True, C=10.0, gamma="scale",
@@ -193,10 +236,13 @@ def train_and_save_models() -> None:
     }
 
     for filename, obj in artifact_map.items():
-        path = os.path.join(model_dir, filename)
-        joblib.dump(obj, path)
+        _dump_atomic(obj, os.path.join(model_dir, filename))
         print(f"      [OK] {filename}")
 
+    # Compiled after the pickles so app.py sees them as up to date
+    export_onnx_forest(rf_model, os.path.join(model_dir, "crop_model.onnx"))
+    export_treelite_forest(rf_model, os.path.join(model_dir, "crop_model.so"))
+
     print("\n" + "=" * 60)
     print("  Training complete. Start the API with: python app.py")
     print("=" * 60)
@@ -0,0 +1,119 @@
+"""
+batching.py — In-process micro-batching for single-row model inference.
+
+Every /api/recommend call scores a single 1×7 feature row, so the fixed
+per-call overhead of predict_proba dominates.  MicroBatcher coalesces rows
+submitted by concurrent request threads (Gunicorn gthread workers) into ONE
+predict_proba call on an N×7 array, then hands each caller back its own
+probability row.
+
+Flow per batch:
+  1. A request thread calls submit(row) and blocks on a Future.
+  2. The background thread takes the first queued row, then drains whatever
+     else is already queued (up to max_batch_size) without waiting.
+  3. Rows are stacked with np.vstack, scored once, and each Future resolved.
+
+There is no fixed batching window: an idle queue flushes a single row
+immediately, so light traffic pays no extra latency.  Under load, rows pile
+up while the previous batch is being scored and are picked up together.
+
+The queue is bounded: when it is full, submit() raises queue.Full so the
+route can shed load with a 503 instead of queueing unboundedly.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-row predictions into batched calls.
+
+    Args:
+        predict_fn:     Callable mapping an (n, n_features) array to an
+                        (n, n_classes) probability array (e.g. predict_proba).
+        max_batch_size: Upper bound on rows scored in one call.
+        max_queue_size: Maximum rows waiting to be scored before submit()
+                        starts rejecting work with queue.Full.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = 64,
+        max_queue_size: int = 1024,
+    ) -> None:
+        self._predict_fn = predict_fn
+        self._max_batch_size = max_batch_size
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future]]" = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid: Optional[int] = None
+
+    def submit(self, features: np.ndarray, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        Score one (1, n_features) row and return its 1-D probability vector.
+
+        Raises:
+            queue.Full:   the batch queue is saturated (caller should shed load).
+            TimeoutError: no result within ``timeout`` seconds.
+        """
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put_nowait((features, future))
+        return future.result(timeout=timeout)
+
+    # ── Internals ─────────────────────────────────────────────────────────────
+
+    def _ensure_worker(self) -> None:
+        """
+        Start the background thread lazily, once per process.
+
+        Threads do not survive fork(), so with Gunicorn preload_app the thread
+        must be started inside each worker rather than at import time.
+        """
+        pid = os.getpid()
+        if self._worker_pid == pid and self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker_pid == pid and self._worker is not None and self._worker.is_alive():
+                return
+            if self._worker_pid != pid:
+                # Fresh process — drop any queue state inherited from the parent
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._worker_pid = pid
+            self._worker.start()
+
+    def _collect_batch(self) -> List[Tuple[np.ndarray, Future]]:
+        """Block for the first row, then drain what is already queued."""
+        batch = [self._queue.get()]
+        while len(batch) < self._max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break  # Queue idle — flush now rather than wait for company
+        return batch
+
+    def _run(self) -> None:
+        """Background loop: collect, score once, scatter results."""
+        while True:
+            batch = self._collect_batch()
+            futures = [future for _, future in batch]
+            try:
+                stacked = np.vstack([features for features, _ in batch])
+                probabilities = self._predict_fn(stacked)
+            except Exception as exc:
+                for future in futures:
+                    future.set_exception(exc)
+                continue
+
+            for row, future in zip(probabilities, futures):
+                future.set_result(row)
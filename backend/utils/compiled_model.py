@@ -0,0 +1,147 @@
+"""
+compiled_model.py — Compiled tree-ensemble inference for the legacy RandomForest.
+
+scikit-learn's RandomForest walks every tree node-by-node, which is dominated by
+per-call overhead when /api/recommend scores a single 1×7 row.  Two compiled
+backends are tried, in order:
+
+  1. ONNX Runtime — crop_model.onnx, exported from the pickle by
+     model/export_compiled.py (run in the Docker build) with skl2onnx; the
+     whole forest runs as one native TreeEnsembleClassifier op.
+  2. Treelite / TL2cgen — crop_model.so, a native predictor with quantised
+     (integer-binned) thresholds.  DEV-ONLY: built locally by
+     `model/export_compiled.py --treelite`; treelite, tl2cgen and gcc are not
+     installed in the Docker image, so production never takes this path.
+
+Both are OPTIONAL.  If neither is installed / available, or loading fails, the
+original scikit-learn model is returned unchanged so the API keeps working
+exactly as before.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any
+
+import numpy as np
+
+
+class OnnxForest:
+    """Adapter giving an ONNX Runtime session the scikit-learn predict_proba API."""
+
+    def __init__(self, session: Any) -> None:
+        self._session = session
+        self._input_name = session.get_inputs()[0].name
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        features = np.asarray(features, dtype=np.float32)
+        return self._session.run(["probabilities"], {self._input_name: features})[0]
+
+
+class TreeliteForest:
+    """Adapter giving a TL2cgen Predictor the scikit-learn predict_proba API."""
+
+    def __init__(self, predictor: Any) -> None:
+        import tl2cgen
+
+        self._predictor = predictor
+        self._dmatrix = tl2cgen.DMatrix
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        features = np.asarray(features, dtype=np.float32)
+        output = self._predictor.predict(self._dmatrix(features))
+        return output.reshape(features.shape[0], -1)
+
+
+def _is_fresh(artifact_path: str, model_path: str) -> bool:
+    """True if the compiled artifact exists and is newer than the source pickle."""
+    return (
+        os.path.exists(artifact_path)
+        and os.path.getmtime(artifact_path) >= os.path.getmtime(model_path)
+    )
+
+
+def _load_onnx(model: Any, model_path: str) -> Any:
+    """Load crop_model.onnx into an ONNX Runtime session; None if unavailable."""
+    onnx_path = os.path.splitext(model_path)[0] + ".onnx"
+    if not _is_fresh(onnx_path, model_path):
+        return None
+
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        print("[i] onnxruntime not installed - skipping crop_model.onnx.")
+        return None
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    # One request is one row; parallelism comes from Gunicorn workers/threads
+    options.intra_op_num_threads = 1
+    try:
+        session = ort.InferenceSession(onnx_path, sess_options=options,
+                                       providers=["CPUExecutionProvider"])
+    except Exception as exc:
+        print(f"[!] Could not load {os.path.basename(onnx_path)} ({exc}).")
+        return None
+
+    # Guard against a graph exported for a different label set
+    shapes = {output.name: output.shape for output in session.get_outputs()}
+    if shapes.get("probabilities", [None, None])[-1] != len(model.classes_):
+        print(f"[!] {os.path.basename(onnx_path)} class count mismatch - ignoring it.")
+        return None
+
+    print(f"[OK] Loaded compiled forest {os.path.basename(onnx_path)}")
+    return OnnxForest(session)
+
+
+def _load_treelite(model: Any, model_path: str) -> Any:
+    """Load crop_model.so via TL2cgen; return None if unavailable or stale."""
+    lib_path = os.path.splitext(model_path)[0] + ".so"
+    if not _is_fresh(lib_path, model_path):
+        return None
+
+    try:
+        import tl2cgen
+    except ImportError:
+        print("[i] tl2cgen not installed - skipping compiled crop_model.so.")
+        return None
+
+    try:
+        predictor = tl2cgen.Predictor(lib_path)
+    except Exception as exc:
+        print(f"[!] Could not load {os.path.basename(lib_path)} ({exc}).")
+        return None
+
+    # Guard against a library compiled for a different label set
+    if int(np.prod(predictor.num_class)) != len(model.classes_):
+        print(f"[!] {os.path.basename(lib_path)} class count mismatch - ignoring it.")
+        return None
+
+    print(f"[OK] Loaded compiled forest {os.path.basename(lib_path)}")
+    return TreeliteForest(predictor)
+
+
+def load_compiled_model(model: Any, model_path: str) -> Any:
+    """
+    Return a predictor exposing ``predict_proba`` for the given fitted forest.
+
+    Args:
+        model:      Fitted scikit-learn tree ensemble (already loaded).
+        model_path: Path of the pickle the model was loaded from; compiled
+                    artifacts live alongside it.
+
+    Returns:
+        An ONNX or TL2cgen predictor if one is available, otherwise
+        ``model``.  Either way the object's ``predict_proba`` returns an
+        (n, n_classes) array in the same class order as ``model.classes_``.
+    """
+    if model is None:
+        return None
+
+    for loader in (_load_onnx, _load_treelite):
+        compiled = loader(model, model_path)
+        if compiled is not None:
+            return compiled
+
+    print("[i] No compiled backend available - using scikit-learn tree inference.")
+    return model
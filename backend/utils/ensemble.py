@@ -8,12 +8,15 @@ Combines probability outputs from three ML models:
 
 The weighted average probabilities are used to produce the final crop ranking.
 Individual model outputs are also returned so the UI can render the 'debate' cards.
+
+The RandomForest is trained on unscaled features (tree splits are scale-invariant),
+so it receives the raw feature vector while SVM / MLP receive the scaled one.
 """
 
 from __future__ import annotations
 
 import numpy as np
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Sequence, Tuple
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -26,6 +29,9 @@ DEFAULT_WEIGHTS: Dict[str, float] = {
     "mlp": 0.25,
 }
 
+# Models trained on raw (unscaled) features
+SCALE_INVARIANT_MODELS = frozenset({"rf"})
+
 # Human-readable display names matched to model keys
 MODEL_LABELS: Dict[str, str] = {
     "rf":  "Random Forest",
@@ -36,7 +42,7 @@ MODEL_LABELS: Dict[str, str] = {
 
 def _get_top_n(
     probabilities: np.ndarray,
-    class_labels: np.ndarray,
+    class_labels: Sequence[str],
     n: int = 3,
     confidence_penalty: float = 0.0,
 ) -> List[Dict[str, Any]]:
@@ -45,7 +51,7 @@ def _get_top_n(
 
     Args:
         probabilities:      1-D array of class probabilities (one per crop).
-        class_labels:       Ordered array of class names matching probabilities.
+        class_labels:       Ordered sequence of class names matching probabilities.
         n:                  Number of top predictions to return.
         confidence_penalty: Float in [0, 0.5] subtracted from each confidence.
 
@@ -67,10 +73,11 @@ def _get_top_n(
 def ensemble_predict(
     models: Dict[str, Any],
     scaled_features: np.ndarray,
-    class_labels: np.ndarray,
+    class_labels: Sequence[str],
     confidence_penalty: float = 0.0,
     weights: Dict[str, float] | None = None,
     top_n: int = 3,
+    raw_features: np.ndarray | None = None,
 ) -> Dict[str, Any]:
     """
     Run inference on all available models and combine their outputs.
@@ -80,11 +87,14 @@ def ensemble_predict(
                             Keys must be a subset of {"rf", "svm", "mlp"}.
                             Missing models are skipped and reported as unavailable.
         scaled_features:    2-D numpy array of shape (1, n_features), already scaled.
-        class_labels:       Ordered array of crop class names from any fitted model.
+        class_labels:       Ordered sequence of crop class names from any fitted model.
         confidence_penalty: Float penalty subtracted from adjusted confidence scores.
         weights:            Override for DEFAULT_WEIGHTS.  Absent models get 0 weight
                             and the remaining weights are re-normalised automatically.
         top_n:              Number of top crops to include in the ensemble result.
+        raw_features:       Unscaled 2-D feature array for SCALE_INVARIANT_MODELS.
+                            Required whenever one of those models is present —
+                            they are trained on raw features.
 
     Returns:
         Dict with keys:
@@ -100,6 +110,8 @@ def ensemble_predict(
     available_keys = [k for k in effective_weights if k in models]
     if not available_keys:
         raise ValueError("No ensemble models are available. Cannot predict.")
+    if raw_features is None and SCALE_INVARIANT_MODELS.intersection(available_keys):
+        raise ValueError("raw_features is required for models trained on unscaled inputs.")
 
     active_weights = {k: effective_weights[k] for k in available_keys}
     weight_total = sum(active_weights.values())
@@ -111,7 +123,8 @@ def ensemble_predict(
 
     for key in available_keys:
         model = models[key]
-        proba = model.predict_proba(scaled_features)[0]
+        features = raw_features if key in SCALE_INVARIANT_MODELS else scaled_features
+        proba = model.predict_proba(features).ravel()  # (1, n_classes) → 1-D view
 
         per_model_votes[key] = {
             "label":        MODEL_LABELS.get(key, key),
@@ -80,7 +80,6 @@ def check_realistic_ranges(data: Dict[str, Any]) -> Tuple[List[str], float]:
         - total_confidence_penalty: float between 0.0 and 0.50.
     """
     warnings: List[str] = []
-    total_penalty: float = 0.0
 
     for field, (low, high, label) in REALISTIC_RANGES.items():
         value = data.get(field)
@@ -91,12 +90,14 @@ def check_realistic_ranges(data: Dict[str, Any]) -> Tuple[List[str], float]:
 
         if value < low:
             warnings.append(f"Input {label} ({value}) is below the expected minimum ({low}).")
-            total_penalty += CONFIDENCE_PENALTY_PER_WARNING
         elif value > high:
             warnings.append(f"Input {label} ({value}) is above the expected maximum ({high}).")
-            total_penalty += CONFIDENCE_PENALTY_PER_WARNING
+
+    # Common case — a well-formed sensor payload has nothing to report
+    if not warnings:
+        return warnings, 0.0
 
     # Cap the total penalty so we still return a usable prediction
-    total_penalty = min(total_penalty, 0.50)
+    total_penalty = min(len(warnings) * CONFIDENCE_PENALTY_PER_WARNING, 0.50)
 
     return warnings, total_penalty